@@ -4,67 +4,572 @@ Handles AI-powered interactions via n8n workflows with Valkey queue management
 """
 
 import os
+import re
+import atexit
+import hashlib
+import gzip
+import functools
 import requests
-from typing import Optional, Dict, Any
-from datetime import datetime
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, Final
+from datetime import datetime, timezone
+import time
+import threading
+import orjson
 import streamlit as st
 import logging
 
+
+class _RepeatedErrorFilter(logging.Filter):
+    """
+    Drop warning/error records from the same log call repeated within a short window
+    
+    During an n8n outage every rerun logs the same failure; the next record that
+    gets through reports how many copies were suppressed. Records are matched on
+    their unformatted template (record.msg), since the formatted text carries
+    elapsed times and exception details that differ on every call, so callers
+    must pass values as %-style args rather than f-strings.
+    """
+    
+    def __init__(self, window_seconds: float = 5.0):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self._last_seen: Dict[tuple, float] = {}
+        self._suppressed: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_seen.get(key)
+            if last is not None and now - last < self.window_seconds:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last_seen[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+            if len(self._last_seen) > 256:
+                self._last_seen = {k: t for k, t in self._last_seen.items() if now - t < self.window_seconds}
+        if suppressed:
+            record.msg = f"{record.getMessage()} (suppressed {suppressed} similar)"
+            record.args = ()
+        return True
+
+
 logger = logging.getLogger(__name__)
+logger.addFilter(_RepeatedErrorFilter())
+
+# Worker threads that send fire-and-forget webhook calls off the Streamlit script thread
+ASYNC_WORKERS = 4
+
+# Request bodies above this size are gzip-compressed when N8N_GZIP_REQUESTS is enabled
+GZIP_MIN_BYTES = 1024
+
+# Keys n8n chat workflows may put the answer under, in priority order
+CHAT_RESPONSE_KEYS = ("output", "text", "answer", "message", "response", "result")
+_MISSING = object()
+
+# Transient statuses the session retries (with backoff) before handing the response back
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Circuit breaker: stop calling a webhook for a while after repeated failures
+CIRCUIT_FAIL_MAX = 5
+CIRCUIT_RESET_SECONDS = 60
+
+# Option letter at the start of an answer, as in "A) Text" or just "A"
+ANSWER_LETTER_PATTERN = re.compile(r"\s*([A-Za-z])")
+
+# Fixed leading fields for each exam workflow action; call sites add the variable ones
+PAYLOAD_SKELETONS: Final[Mapping[str, Mapping[str, Any]]] = MappingProxyType({
+    "generate_questions": MappingProxyType({"action": "generate_questions"}),
+    "quit_session": MappingProxyType({"action": "quit_session"})
+})
+
+# ============================================
+# FALLBACK KNOWLEDGE BASE
+# ============================================
+
+FALLBACK_KNOWLEDGE_BASE: Final[Mapping[str, str]] = MappingProxyType({
+    "s3": """Amazon S3 (Simple Storage Service) is an object storage service offering:
+            - Scalability: Store unlimited data
+            - Durability: 99.999999999% (11 9's) durability
+            - Storage Classes: Standard, Intelligent-Tiering, Glacier, etc.
+            - Security: Encryption, access control, versioning
+            - Use Cases: Backup, data lakes, web hosting, content distribution""",
+
+    "ec2": """Amazon EC2 (Elastic Compute Cloud) provides scalable computing capacity:
+            - Instance Types: General purpose, compute optimized, memory optimized
+            - Pricing: On-Demand, Reserved, Spot, Savings Plans
+            - Features: Auto Scaling, Elastic Load Balancing, Amazon EBS
+            - Use Cases: Web applications, batch processing, gaming servers""",
+
+    "vpc": """Amazon VPC (Virtual Private Cloud) provides isolated network resources:
+            - Subnets: Public and private subnets for resource organization
+            - Security: Security groups and Network ACLs
+            - Connectivity: Internet Gateway, NAT Gateway, VPN
+            - Best Practice: Use multiple availability zones for high availability""",
+
+    "iam": """AWS IAM (Identity and Access Management) controls access:
+            - Users: Individual identities with credentials
+            - Groups: Collections of users with shared permissions
+            - Roles: Temporary credentials for services and applications
+            - Policies: JSON documents defining permissions
+            - Best Practice: Follow principle of least privilege""",
+
+    "lambda": """AWS Lambda is a serverless compute service:
+            - Event-driven: Runs code in response to triggers
+            - Pricing: Pay only for compute time used
+            - Scalability: Automatically scales based on demand
+            - Languages: Python, Node.js, Java, Go, Ruby, .NET
+            - Use Cases: APIs, data processing, automation"""
+})
+
+FALLBACK_MATCH_TEMPLATE = "Based on AWS best practices:\n\n{answer}\n\n💡 Tip: Configure n8n webhook for AI-powered answers!"
+FALLBACK_GENERIC_TEMPLATE = "Thank you for your question: '{question}'\n\nPlease configure N8N_CHAT_WEBHOOK_URL in Streamlit secrets for AI-powered responses."
+
+FALLBACK_TRICKS_TEMPLATES: Final[Mapping[str, str]] = MappingProxyType({
+    "mnemonic": "Create a memorable acronym for {topic} concepts",
+    "analogy": "Think of {topic} like everyday objects and processes",
+    "visualization": "Draw diagrams to visualize {topic} architecture"
+})
+
+FALLBACK_KEY_POINTS = (
+    "Practice with hands-on labs",
+    "Review AWS documentation",
+    "Take practice exams regularly",
+    "Join study groups"
+)
+
+FALLBACK_EVALUATION: Final[Mapping[str, Any]] = MappingProxyType({
+    "score": 0,
+    "feedback": "Evaluation not configured"
+})
+
+# Keyword answers rendered once at import, so a match is a plain lookup
+FALLBACK_RESPONSES: Final[Mapping[str, str]] = MappingProxyType({
+    keyword: FALLBACK_MATCH_TEMPLATE.format(answer=answer)
+    for keyword, answer in FALLBACK_KNOWLEDGE_BASE.items()
+})
+
+# All keywords in one alternation, so a question is scanned once instead of once per keyword.
+# Plain substring matches, so "lambdas", "s3bucket" and "ec2-instance" still find their topic.
+FALLBACK_KEYWORD_PATTERN = re.compile("|".join(map(re.escape, FALLBACK_KNOWLEDGE_BASE)), re.IGNORECASE)
+
+# When a question names several topics, the first in FALLBACK_KNOWLEDGE_BASE wins (not the first in the text)
+FALLBACK_KEYWORD_RANK: Final[Mapping[str, int]] = MappingProxyType({
+    keyword: rank for rank, keyword in enumerate(FALLBACK_KNOWLEDGE_BASE)
+})
+
+
+@functools.cache
+def _get_n8n_config() -> Dict[str, Any]:
+    """Read n8n webhook URLs and timeouts once per process"""
+    try:
+        secrets = dict(st.secrets)
+    except Exception:
+        # No secrets.toml (e.g. env-only deployments or scripts): use environment variables
+        secrets = {}
+    
+    # n8n settings from Streamlit secrets or environment variables
+    return {
+        "chat_webhook": secrets.get("N8N_CHAT_WEBHOOK_URL", os.getenv("N8N_CHAT_WEBHOOK_URL")),
+        "exam_webhook": secrets.get("N8N_EXAM_WEBHOOK_URL", os.getenv("N8N_EXAM_WEBHOOK_URL")),
+        "tricks_webhook": secrets.get("N8N_TRICKS_WEBHOOK_URL", os.getenv("N8N_TRICKS_WEBHOOK_URL")),
+        "evaluation_webhook": secrets.get("N8N_EVALUATION_WEBHOOK_URL", os.getenv("N8N_EVALUATION_WEBHOOK_URL")),
+        "connect_timeout": float(secrets.get("N8N_CONNECT_TIMEOUT", os.getenv("N8N_CONNECT_TIMEOUT", "3.05"))),
+        "read_timeout": float(secrets.get("N8N_READ_TIMEOUT", os.getenv("N8N_READ_TIMEOUT", "30"))),
+        # Only enable when n8n (or its reverse proxy) accepts Content-Encoding: gzip
+        "gzip_requests": str(secrets.get("N8N_GZIP_REQUESTS", os.getenv("N8N_GZIP_REQUESTS", "false"))).lower() in ("1", "true", "yes")
+    }
+
+
+def _build_http_session(retry: bool = True) -> requests.Session:
+    """
+    Build a pooled HTTP session shared by every AIService instance
+    
+    HTTP/1.1 keep-alive is used deliberately: n8n is reached over plain http://<ip>:5678,
+    where HTTP/2 (TLS/ALPN only in httpx) can't be negotiated, so the pool is what
+    removes the per-call handshake.
+    
+    Args:
+        retry: Retry connect errors and transient statuses; fire-and-forget calls pass
+               False so a trigger is never sent twice
+    """
+    session = requests.Session()
+    if retry:
+        # Webhooks are POSTs, which urllib3 does not retry unless explicitly allowed.
+        # read=False: a read timeout means n8n already received the request, and POSTs
+        # aren't idempotent, so it is raised as ReadTimeout instead of being sent again.
+        # Exponential backoff (0.5s base, 8s cap) with jitter; 4xx other than 429 is never retried.
+        max_retries = Retry(
+            total=3,
+            read=False,
+            backoff_factor=0.5,
+            backoff_max=8,
+            backoff_jitter=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    else:
+        max_retries = 0
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=max_retries
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Bodies are pre-encoded bytes, so the JSON content type must be set explicitly
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Connection": "keep-alive"
+    })
+    return session
+
+
+def _json_dumps(data: Any, indent: bool = False) -> bytes:
+    """Encode JSON with orjson (datetimes serialized as UTC with a Z suffix)"""
+    option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, option=option)
+
+
+def _json_loads(raw: Any) -> Any:
+    """Decode JSON with orjson"""
+    return orjson.loads(raw)
+
+
+def _as_result_dict(result: Any, text_key: str) -> Dict[str, Any]:
+    """
+    Normalize an already-parsed webhook result to a dict
+    
+    Only string results can still hold JSON text, so nothing else is re-serialized
+    and parsed again; anything that isn't a dict is wrapped under text_key.
+    """
+    if isinstance(result, dict):
+        return result
+    if isinstance(result, str):
+        try:
+            parsed = _json_loads(result)
+        except ValueError:
+            return {text_key: result}
+        if isinstance(parsed, dict):
+            return parsed
+    return {text_key: str(result)}
+
+
+# (epoch seconds, ISO string) of the last formatted timestamp
+_timestamp_cache = (0.0, "")
+
+
+def _now_iso() -> str:
+    """UTC ISO-8601 timestamp, re-formatted at most every 250 ms"""
+    global _timestamp_cache
+    now = time.time()
+    if now - _timestamp_cache[0] > 0.25:
+        _timestamp_cache = (now, datetime.fromtimestamp(now, tz=timezone.utc).isoformat())
+    return _timestamp_cache[1]
+
+
+def _cache_key(*parts: Any) -> str:
+    """Compact, stable cache key for a webhook request"""
+    return hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=16).hexdigest()
+
+
+def _checked_webhook_call(service: "AIService", webhook_url: str, data: Dict[str, Any]) -> Any:
+    """
+    Call an n8n webhook on a cache miss
+    
+    Errors are raised instead of returned so that failed calls are never cached.
+    """
+    result = service._call_n8n_webhook(webhook_url, data)
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"n8n webhook error: {result['error']}")
+    return result
+
+
+@st.cache_data(ttl=600, max_entries=1024, show_spinner=False)
+def _cached_webhook_call(webhook_url: str, cache_key: str, _service: "AIService", _data: Dict[str, Any]) -> Any:
+    """Call an n8n webhook once per cache_key for 10 minutes"""
+    return _checked_webhook_call(_service, webhook_url, _data)
+
+
+@st.cache_data(ttl=24 * 3600, max_entries=512, show_spinner=False)
+def _cached_tricks_call(webhook_url: str, cache_key: str, _service: "AIService", _data: Dict[str, Any]) -> Any:
+    """Call the study tricks webhook once per (certification, topic) for a day"""
+    return _checked_webhook_call(_service, webhook_url, _data)
+
+
+def extract_letter(answer: Any) -> str:
+    """Extract the option letter from 'A) Text' or 'A' format"""
+    match = ANSWER_LETTER_PATTERN.match(str(answer))
+    return match.group(1).upper() if match else ''
+
+
+def _normalize_answer(answer: Any) -> tuple:
+    """Normalize an answer (single or list) to a sorted tuple of letters"""
+    if isinstance(answer, list):
+        return tuple(sorted(extract_letter(a) for a in answer))
+    return (extract_letter(answer),)
+
+
+def _log_background_error(future: Future):
+    """Done-callback for fire-and-forget calls, whose exceptions nobody else sees"""
+    error = future.exception()
+    if error is not None:
+        logger.error("Background n8n webhook call failed: %s", error)
+
 
 class AIService:
     """AI Service that communicates with n8n workflows"""
     
+    # Keep-alive sessions shared across instances, even ones built outside get_ai_service()
+    _session: Optional[requests.Session] = None
+    _async_session: Optional[requests.Session] = None
+    _background: Optional[ThreadPoolExecutor] = None
+    _background_lock = threading.Lock()
+    
+    # Per-webhook circuit breaker state: url -> (consecutive failures, last failure time)
+    _circuits: Dict[str, tuple] = {}
+    _circuit_lock = threading.Lock()
+    
+    # Single-flight: payload key -> Future of the request currently in progress
+    _inflight: Dict[str, Future] = {}
+    _inflight_lock = threading.Lock()
+    
     def __init__(self):
-        # n8n webhook URLs from Streamlit secrets or environment variables
-        self.chat_webhook = st.secrets.get("N8N_CHAT_WEBHOOK_URL", os.getenv("N8N_CHAT_WEBHOOK_URL"))
-        self.exam_webhook = st.secrets.get("N8N_EXAM_WEBHOOK_URL", os.getenv("N8N_EXAM_WEBHOOK_URL"))
-        self.tricks_webhook = st.secrets.get("N8N_TRICKS_WEBHOOK_URL", os.getenv("N8N_TRICKS_WEBHOOK_URL"))
-        self.evaluation_webhook = st.secrets.get("N8N_EVALUATION_WEBHOOK_URL", os.getenv("N8N_EVALUATION_WEBHOOK_URL"))
+        config = _get_n8n_config()
+        self.chat_webhook = config["chat_webhook"]
+        self.exam_webhook = config["exam_webhook"]
+        self.tricks_webhook = config["tricks_webhook"]
+        self.evaluation_webhook = config["evaluation_webhook"]
+        
+        # Each endpoint falls back on its own when its URL isn't configured
+        self._endpoints: Dict[str, Optional[str]] = {
+            "chat": self.chat_webhook,
+            "exam": self.exam_webhook,
+            "tricks": self.tricks_webhook,
+            "evaluation": self.evaluation_webhook
+        }
+        
+        # Connect fails fast, read waits for the LLM workflow to finish
+        self.connect_timeout = config["connect_timeout"]
+        self.read_timeout = config["read_timeout"]
+        self.gzip_requests = config["gzip_requests"]
+        
+        if AIService._session is None:
+            AIService._session = _build_http_session()
+        if AIService._async_session is None:
+            AIService._async_session = _build_http_session(retry=False)
+        self._session = AIService._session
+        self._async_session = AIService._async_session
+    
+    @classmethod
+    def close(cls):
+        """Close the shared HTTP session and release pooled connections"""
+        if cls._background is not None:
+            # Let queued fire-and-forget calls go out; each is capped by its short timeout
+            cls._background.shutdown(wait=True)
+            cls._background = None
+        if cls._session is not None:
+            cls._session.close()
+            cls._session = None
+        if cls._async_session is not None:
+            cls._async_session.close()
+            cls._async_session = None
+    
+    def _endpoint(self, name: str) -> Optional[str]:
+        """Webhook URL for an endpoint, or None when it isn't configured"""
+        return self._endpoints.get(name)
+    
+    def _payload(self, action: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        """
+        Build a webhook payload from the given fields plus the shared timestamp
         
-        # Fallback mode if no webhooks configured
-        self.use_fallback = not self.chat_webhook
+        Args:
+            action: Exam workflow action; must be a key of PAYLOAD_SKELETONS
+            fields: Variable fields for this call
+        Returns:
+            dict: Payload with a stable key order (action, fields, timestamp)
+        """
+        if action is None:
+            data = fields
+        else:
+            data = dict(PAYLOAD_SKELETONS[action])
+            data.update(fields)
+        data["timestamp"] = _now_iso()
+        return data
+    
+    def _background_executor(self) -> ThreadPoolExecutor:
+        """Shared pool for fire-and-forget calls, created on first use"""
+        with AIService._background_lock:
+            if AIService._background is None:
+                AIService._background = ThreadPoolExecutor(
+                    max_workers=ASYNC_WORKERS,
+                    thread_name_prefix="n8n-async"
+                )
+            return AIService._background
     
-    def _call_n8n_webhook(self, webhook_url: str, data: Dict[str, Any], async_call: bool = False) -> Any:
+    def _circuit_open(self, webhook_url: str) -> bool:
+        """Check whether calls to a webhook are currently short-circuited"""
+        with AIService._circuit_lock:
+            failures, opened_at = AIService._circuits.get(webhook_url, (0, 0.0))
+            if failures < CIRCUIT_FAIL_MAX:
+                return False
+            if time.monotonic() - opened_at >= CIRCUIT_RESET_SECONDS:
+                # Half-open: let the next call through as a probe
+                AIService._circuits[webhook_url] = (CIRCUIT_FAIL_MAX - 1, 0.0)
+                return False
+            return True
+    
+    def _record_call(self, webhook_url: str, success: bool):
+        """Track consecutive failures per webhook and open its circuit after too many"""
+        with AIService._circuit_lock:
+            if success:
+                AIService._circuits.pop(webhook_url, None)
+                return
+            failures, _ = AIService._circuits.get(webhook_url, (0, 0.0))
+            failures += 1
+            AIService._circuits[webhook_url] = (failures, time.monotonic())
+            if failures == CIRCUIT_FAIL_MAX:
+                logger.warning("n8n webhook unavailable, pausing calls for %ss: %s", CIRCUIT_RESET_SECONDS, webhook_url)
+    
+    def _call_n8n_webhook(
+        self,
+        webhook_url: str,
+        data: Dict[str, Any],
+        async_call: bool = False,
+        read_timeout: Optional[float] = None
+    ) -> Any:
         """
         Call n8n webhook
         
+        Identical synchronous calls that overlap (double clicks, rerun thrash) share a
+        single request: the first caller sends it and the others wait for its result.
+        After CIRCUIT_FAIL_MAX consecutive failures on the same URL, calls are skipped
+        for CIRCUIT_RESET_SECONDS instead of waiting on a dead n8n instance.
+        
         Args:
             webhook_url: The n8n webhook URL
             data: Data to send to the webhook
-            async_call: If True, don't wait for response (fire and forget)
+            async_call: If True, send from a background thread and return immediately
+            read_timeout: Per-call read timeout override (defaults to self.read_timeout)
         Returns:
-            Response from n8n workflow or None if async
+            Response from n8n workflow, or the Future of the background send if async
         """
+        if async_call:
+            future = self._background_executor().submit(
+                self._send_webhook, webhook_url, data, True, read_timeout
+            )
+            future.add_done_callback(_log_background_error)
+            return future
+        
+        # The timestamp differs between otherwise identical calls, so leave it out of the key
+        key = _cache_key(webhook_url, _json_dumps({k: v for k, v in data.items() if k != "timestamp"}))
+        with AIService._inflight_lock:
+            future = AIService._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                AIService._inflight[key] = future
+        
+        if not is_leader:
+            return future.result()
+        
         try:
+            result = self._send_webhook(webhook_url, data, False, read_timeout)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with AIService._inflight_lock:
+                AIService._inflight.pop(key, None)
+    
+    def _send_webhook(
+        self,
+        webhook_url: str,
+        data: Dict[str, Any],
+        async_call: bool,
+        read_timeout: Optional[float]
+    ) -> Any:
+        """Send one webhook request, applying the circuit breaker and mapping timeouts to errors"""
+        started = time.monotonic()
+        if self._circuit_open(webhook_url):
+            if not async_call:
+                return {"error": "n8n unavailable", "retryable": False}
+            return None
+        
+        try:
+            # Encode once with orjson instead of letting requests run json.dumps
+            body = _json_dumps(data)
+            headers = None
+            if self.gzip_requests and len(body) > GZIP_MIN_BYTES:
+                body = gzip.compress(body, compresslevel=1)
+                headers = {"Content-Encoding": "gzip"}
+            
             if async_call:
                 # Fire and forget - don't wait for response
-                requests.post(
-                    webhook_url,
-                    json=data,
-                    timeout=2,  # Short timeout for async calls
-                    headers={"Content-Type": "application/json"}
-                )
+                try:
+                    response = self._async_session.post(
+                        webhook_url,
+                        data=body,
+                        headers=headers,
+                        timeout=2  # Short timeout for async calls
+                    )
+                    if response.status_code >= 400:
+                        logger.warning("n8n webhook returned HTTP %s: %s", response.status_code, webhook_url)
+                except requests.exceptions.ReadTimeout:
+                    # Expected: the workflow is still running when we stop listening
+                    pass
+                self._record_call(webhook_url, True)
                 return None
             else:
-                response = requests.post(
+                response = self._session.post(
                     webhook_url,
-                    json=data,
-                    headers={"Content-Type": "application/json"}
+                    data=body,
+                    headers=headers,
+                    timeout=(self.connect_timeout, read_timeout or self.read_timeout)
                 )
+                self._record_call(webhook_url, response.status_code < 500)
                 
                 if response.status_code == 200:
-                    return response.json()
+                    return _json_loads(response.content)
                 else:
-                    logger.error(f"n8n webhook error: {response.status_code}")
+                    if response.status_code in RETRY_STATUSES:
+                        # Transient 429/5xx were already retried by the session adapter
+                        logger.warning("n8n webhook still returned HTTP %s after retries: %s", response.status_code, webhook_url)
+                    else:
+                        # 4xx: deactivated or misconfigured webhook, retrying wouldn't help
+                        logger.warning("n8n webhook returned HTTP %s: %s", response.status_code, webhook_url)
                     return {"error": f"HTTP {response.status_code}"}
                     
-        except requests.exceptions.Timeout:
+        except requests.exceptions.ConnectTimeout:
+            self._record_call(webhook_url, False)
+            if not async_call:
+                logger.error("n8n webhook connect timeout after %.1fs", time.monotonic() - started)
+                return {"error": "Connection timed out", "retryable": True}
+            # Unlike a read timeout, the request never reached n8n
+            raise
+        except requests.exceptions.ReadTimeout:
+            self._record_call(webhook_url, False)
             if not async_call:
-                logger.error("n8n webhook timeout")
-                return {"error": "Request timed out"}
+                logger.error("n8n webhook read timeout after %.1fs", time.monotonic() - started)
+                return {"error": "Request timed out", "retryable": False}
             return None
+        except requests.exceptions.ConnectionError:
+            self._record_call(webhook_url, False)
+            raise
     
     # ============================================
     # CHAT OPERATIONS
@@ -77,29 +582,38 @@ class AIService:
         context: Optional[str] = None
     ) -> str:
         """Answer a question using n8n chat workflow"""
-        if self.use_fallback or not self.chat_webhook:
+        url = self._endpoint("chat")
+        if not url:
             return self._get_fallback_response(question)
         
         try:
-            data = {
-                "user_id": user_id,
-                "question": question,
-                "context": context or "",
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            data = self._payload(
+                user_id=user_id,
+                question=question,
+                context=context or ""
+            )
             
-            result = self._call_n8n_webhook(self.chat_webhook, data)
+            result = _cached_webhook_call(
+                url,
+                # Per user: n8n receives user_id and may personalise the answer or keep history
+                _cache_key("chat", user_id, question, context),
+                self,
+                data
+            )
             
             if isinstance(result, dict):
-                # Extract response from various possible keys
-                for key in ["output", "text", "answer", "message", "response", "result"]:
-                    if key in result:
-                        return str(result[key])
-                return json.dumps(result, indent=2)
+                # Extract response from various possible keys (single lookup per key)
+                for key in CHAT_RESPONSE_KEYS:
+                    value = result.get(key, _MISSING)
+                    if value is not _MISSING:
+                        return value if isinstance(value, str) else str(value)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Chat response has no known answer key:\n{_json_dumps(result, indent=True).decode()}")
+                return _json_dumps(result).decode()
             
             return str(result)
         except Exception as e:
-            logger.error(f"Error in chat service: {e}")
+            logger.error("Error in chat service: %s", e)
             return self._get_fallback_response(question)
     
     # ============================================
@@ -117,33 +631,44 @@ class AIService:
     ) -> bool:
         """
         Trigger background question generation workflow
-        The workflow will continuously generate questions and push to Valkey queue
+        The workflow will continuously generate questions and push to Valkey queue.
+        A single call covers the whole exam (total_questions), so questions are never
+        requested one webhook round-trip at a time.
+        
+        The trigger is sent from the background pool. This waits up to the connect
+        timeout for it, so an unreachable n8n (refused, DNS, connect timeout) fails
+        here rather than after the full wait for the first question; a workflow
+        that is still running counts as started.
         
         Returns:
-            bool: Success status of trigger
+            bool: True once the trigger reached n8n, False if exam generation is unavailable
         """
-        if not self.exam_webhook:
+        url = self._endpoint("exam")
+        if not url or self._circuit_open(url):
             return False
         
         try:
-            data = {
-                "action": "generate_questions",
-                "session_id": session_id,
-                "user_id": user_id,
-                "certification": certification,
-                "difficulty": difficulty,
-                "total_questions": total_questions,
-                "topic": topic,
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            data = self._payload(
+                action="generate_questions",
+                session_id=session_id,
+                user_id=user_id,
+                certification=certification,
+                difficulty=difficulty,
+                total_questions=total_questions,
+                topic=topic
+            )
             
-            # Async call - don't wait for response
-            self._call_n8n_webhook(self.exam_webhook, data, async_call=True)
+            # Async call - don't wait for the workflow, only for the connection
+            future = self._call_n8n_webhook(url, data, async_call=True)
+            try:
+                future.result(timeout=self.connect_timeout)
+            except FutureTimeoutError:
+                pass  # Connected; n8n is still generating
             logger.info(f"✅ Triggered exam generation for session {session_id}")
             return True
             
         except Exception as e:
-            logger.error(f"Error triggering exam generation: {e}")
+            logger.error("Error triggering exam generation: %s", e)
             return False
     
     def check_answer(
@@ -164,36 +689,14 @@ class AIService:
         Returns:
             dict: Result with is_correct and explanation
         """
-        # Extract just the letter (A, B, C, D) from answers
-        def extract_letter(answer):
-            """Extract letter from 'A) Text' or 'A' format"""
-            answer_str = str(answer).strip().upper()
-            # If format is "A) Something", extract just "A"
-            if ')' in answer_str:
-                return answer_str.split(')')[0].strip()
-            # If already just a letter, return it
-            return answer_str[0] if answer_str else ''
-        
-        def normalize_answer(answer):
-            """Normalize answer to list of letters"""
-            if isinstance(answer, list):
-                return sorted([extract_letter(a) for a in answer])
-            return [extract_letter(answer)]
-        
-        user_normalized = normalize_answer(user_answer)
-        correct_normalized = normalize_answer(correct_answer)
+        user_normalized = _normalize_answer(user_answer)
+        correct_normalized = _normalize_answer(correct_answer)
         
         is_correct = user_normalized == correct_normalized
         
-        # Format correct answer for display
-        if isinstance(correct_answer, list):
-            display_correct = correct_answer
-        else:
-            display_correct = correct_answer
-        
         return {
             "is_correct": is_correct,
-            "correct_answer": display_correct,
+            "correct_answer": correct_answer,
             "explanation": explanation,
             "user_answer": user_answer
         }
@@ -208,31 +711,33 @@ class AIService:
         certification: str,
         topic: str
     ) -> Dict[str, Any]:
-        """Get study tricks and tips using n8n workflow"""
-        if self.use_fallback or not self.tricks_webhook:
+        """
+        Get study tricks and tips using n8n workflow
+        
+        Results are shared across users per (certification, topic) for a day.
+        """
+        url = self._endpoint("tricks")
+        if not url:
             return self._get_fallback_tricks(topic)
         
         try:
-            data = {
-                "user_id": user_id,
-                "certification": certification,
-                "topic": topic,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            result = self._call_n8n_webhook(self.tricks_webhook, data)
+            data = self._payload(
+                user_id=user_id,
+                certification=certification,
+                topic=topic
+            )
             
-            if isinstance(result, dict):
-                return result
+            result = _cached_tricks_call(
+                url,
+                _cache_key("tricks", certification, (topic or "").strip().lower()),
+                self,
+                data
+            )
             
-            # Try to parse as JSON
-            try:
-                return json.loads(str(result))
-            except:
-                return {"tricks": str(result)}
+            return _as_result_dict(result, "tricks")
                 
         except Exception as e:
-            logger.error(f"Error in tricks service: {e}")
+            logger.error("Error in tricks service: %s", e)
             return self._get_fallback_tricks(topic)
     
     def evaluate_answer(
@@ -243,95 +748,60 @@ class AIService:
         certification: str
     ) -> Dict[str, Any]:
         """Evaluate user's written answer using n8n workflow"""
-        if self.use_fallback or not self.evaluation_webhook:
-            return {"score": 0, "feedback": "Evaluation not configured"}
+        url = self._endpoint("evaluation")
+        if not url:
+            return dict(FALLBACK_EVALUATION)
         
         try:
-            data = {
-                "user_id": user_id,
-                "question": question,
-                "user_answer": user_answer,
-                "certification": certification,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            result = self._call_n8n_webhook(self.evaluation_webhook, data)
+            data = self._payload(
+                user_id=user_id,
+                question=question,
+                user_answer=user_answer,
+                certification=certification
+            )
             
-            if isinstance(result, dict):
-                return result
+            result = self._call_n8n_webhook(url, data)
             
-            # Try to parse as JSON
-            try:
-                return json.loads(str(result))
-            except:
-                return {"feedback": str(result)}
+            return _as_result_dict(result, "feedback")
                 
         except Exception as e:
-            logger.error(f"Error in evaluation service: {e}")
+            logger.error("Error in evaluation service: %s", e)
             return {"error": str(e)}
     
     # ============================================
     # FALLBACK RESPONSES
     # ============================================
     
-    def _get_fallback_response(self, question: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _get_fallback_response(question: str) -> str:
         """Fallback response system when AI APIs are not available"""
+        matches = FALLBACK_KEYWORD_PATTERN.findall(question)
+        if matches:
+            keyword = min((m.lower() for m in matches), key=FALLBACK_KEYWORD_RANK.__getitem__)
+            return FALLBACK_RESPONSES[keyword]
         
-        knowledge_base = {
-            "s3": """Amazon S3 (Simple Storage Service) is an object storage service offering:
-            - Scalability: Store unlimited data
-            - Durability: 99.999999999% (11 9's) durability
-            - Storage Classes: Standard, Intelligent-Tiering, Glacier, etc.
-            - Security: Encryption, access control, versioning
-            - Use Cases: Backup, data lakes, web hosting, content distribution""",
-            
-            "ec2": """Amazon EC2 (Elastic Compute Cloud) provides scalable computing capacity:
-            - Instance Types: General purpose, compute optimized, memory optimized
-            - Pricing: On-Demand, Reserved, Spot, Savings Plans
-            - Features: Auto Scaling, Elastic Load Balancing, Amazon EBS
-            - Use Cases: Web applications, batch processing, gaming servers""",
-            
-            "vpc": """Amazon VPC (Virtual Private Cloud) provides isolated network resources:
-            - Subnets: Public and private subnets for resource organization
-            - Security: Security groups and Network ACLs
-            - Connectivity: Internet Gateway, NAT Gateway, VPN
-            - Best Practice: Use multiple availability zones for high availability""",
-            
-            "iam": """AWS IAM (Identity and Access Management) controls access:
-            - Users: Individual identities with credentials
-            - Groups: Collections of users with shared permissions
-            - Roles: Temporary credentials for services and applications
-            - Policies: JSON documents defining permissions
-            - Best Practice: Follow principle of least privilege""",
-            
-            "lambda": """AWS Lambda is a serverless compute service:
-            - Event-driven: Runs code in response to triggers
-            - Pricing: Pay only for compute time used
-            - Scalability: Automatically scales based on demand
-            - Languages: Python, Node.js, Java, Go, Ruby, .NET
-            - Use Cases: APIs, data processing, automation"""
-        }
-        
-        question_lower = question.lower()
-        for keyword, answer in knowledge_base.items():
-            if keyword in question_lower:
-                return f"Based on AWS best practices:\n\n{answer}\n\n💡 Tip: Configure n8n webhook for AI-powered answers!"
-        
-        return f"Thank you for your question: '{question}'\n\nPlease configure N8N_CHAT_WEBHOOK_URL in Streamlit secrets for AI-powered responses."
+        return FALLBACK_GENERIC_TEMPLATE.format(question=question)
     
     def _get_fallback_tricks(self, topic: str) -> Dict[str, Any]:
         """Fallback study tricks when n8n is not configured"""
-        return {
-            "mnemonic": f"Create a memorable acronym for {topic} concepts",
-            "analogy": f"Think of {topic} like everyday objects and processes",
-            "visualization": f"Draw diagrams to visualize {topic} architecture",
-            "key_points": [
-                "Practice with hands-on labs",
-                "Review AWS documentation",
-                "Take practice exams regularly",
-                "Join study groups"
-            ]
+        tricks: Dict[str, Any] = {
+            key: template.format(topic=topic)
+            for key, template in FALLBACK_TRICKS_TEMPLATES.items()
         }
+        tricks["key_points"] = list(FALLBACK_KEY_POINTS)
+        return tricks
+
+
+# Release pooled connections and worker threads when the process exits
+atexit.register(AIService.close)
+
+
+# Create a singleton instance
+@st.cache_resource
+def get_ai_service():
+    """Get cached AI service instance"""
+    return AIService()
 
 
 if __name__ == "__main__":
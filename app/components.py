@@ -5,91 +5,46 @@ Reusable components for toast notifications, modals, and animations
 
 import streamlit as st
 
+# Toast styling per notification type
+TOAST_ICONS = {
+    "success": "✅",
+    "error": "❌",
+    "warning": "⚠️",
+    "info": "ℹ️"
+}
 
-def show_toast(message, type="success", duration=3):
-    """
-    Display a toast notification
-    
-    Args:
-        message: The message to display
-        type: success, error, warning, info
-        duration: How long to show (seconds)
-    """
-    icons = {
-        "success": "✅",
-        "error": "❌",
-        "warning": "⚠️",
-        "info": "ℹ️"
-    }
-    
-    colors = {
-        "success": "#10b981",
-        "error": "#ef4444",
-        "warning": "#f59e0b",
-        "info": "#3b82f6"
-    }
-    
-    backgrounds = {
-        "success": "rgba(16, 185, 129, 0.1)",
-        "error": "rgba(239, 68, 68, 0.1)",
-        "warning": "rgba(245, 158, 11, 0.1)",
-        "info": "rgba(59, 130, 246, 0.1)"
-    }
-    
-    icon = icons.get(type, "ℹ️")
-    color = colors.get(type, "#3b82f6")
-    bg = backgrounds.get(type, "rgba(59, 130, 246, 0.1)")
-    
-    st.markdown(f"""
-    <div style="
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(15px);
-        border-left: 4px solid {color};
-        border-radius: 0.75rem;
-        padding: 1rem 1.5rem;
-        box-shadow: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        z-index: 9999;
-        animation: slideInRight 0.3s ease-out, fadeOut 0.5s ease-out {duration - 0.5}s forwards;
-        min-width: 300px;
-        max-width: 400px;
-    ">
-        <div style="display: flex; align-items: center; gap: 1rem;">
-            <div style="font-size: 1.5rem;">{icon}</div>
-            <div style="flex: 1; color: #4b5563; font-weight: 500;">{message}</div>
-        </div>
-    </div>
-    
-    <style>
-    @keyframes slideInRight {{
-        from {{
-            transform: translateX(100%);
-            opacity: 0;
-        }}
-        to {{
-            transform: translateX(0);
-            opacity: 1;
-        }}
-    }}
-    
-    @keyframes fadeOut {{
-        from {{
-            opacity: 1;
-        }}
-        to {{
-            opacity: 0;
-            transform: translateX(100%);
-        }}
-    }}
-    </style>
-    """, unsafe_allow_html=True)
+TOAST_COLORS = {
+    "success": "#10b981",
+    "error": "#ef4444",
+    "warning": "#f59e0b",
+    "info": "#3b82f6"
+}
+
+TOAST_BACKGROUNDS = {
+    "success": "rgba(16, 185, 129, 0.1)",
+    "error": "rgba(239, 68, 68, 0.1)",
+    "warning": "rgba(245, 158, 11, 0.1)",
+    "info": "rgba(59, 130, 246, 0.1)"
+}
 
+# Quiz option background, border and result icon per display state
+QUIZ_OPTION_STYLES = {
+    "default": ("rgba(255, 255, 255, 0.9)", "#e5e7eb", ""),
+    "selected": ("rgba(255, 153, 0, 0.1)", "#FF9900", ""),
+    "correct": (
+        "rgba(16, 185, 129, 0.1)",
+        "#10b981",
+        '<span style="color: #10b981; font-size: 1.5rem; margin-left: auto;">✓</span>'
+    ),
+    "incorrect": (
+        "rgba(239, 68, 68, 0.1)",
+        "#ef4444",
+        '<span style="color: #ef4444; font-size: 1.5rem; margin-left: auto;">✗</span>'
+    )
+}
 
-def show_confetti():
-    """Trigger confetti animation for celebrations"""
-    st.markdown("""
+# Confetti script, built once at import instead of per call
+CONFETTI_HTML = """
     <script src="https://cdn.jsdelivr.net/npm/canvas-confetti@1.5.1/dist/confetti.browser.min.js"></script>
     <script>
         var duration = 3 * 1000;
@@ -121,9 +76,69 @@ def show_confetti():
             }));
         }, 250);
     </script>
+    """
+
+
+def show_toast(message, type="success", duration=3, use_custom=False):
+    """
+    Display a toast notification
+    
+    Uses Streamlit's native st.toast by default. The custom HTML variant takes its
+    animations from get_custom_css(), which the page injects once per run.
+    
+    Args:
+        message: The message to display
+        type: success, error, warning, info
+        duration: How long to show (seconds, custom variant only)
+        use_custom: Render the styled HTML toast instead of the native one
+    """
+    icon = TOAST_ICONS.get(type, "ℹ️")
+    if not use_custom:
+        st.toast(message, icon=icon)
+        return
+    
+    color = TOAST_COLORS.get(type, "#3b82f6")
+    bg = TOAST_BACKGROUNDS.get(type, "rgba(59, 130, 246, 0.1)")
+    
+    st.markdown(f"""
+    <div style="
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: rgba(255, 255, 255, 0.95);
+        backdrop-filter: blur(15px);
+        border-left: 4px solid {color};
+        border-radius: 0.75rem;
+        padding: 1rem 1.5rem;
+        box-shadow: 0 10px 15px -3px rgb(0 0 0 / 0.1);
+        z-index: 9999;
+        animation: toastSlideIn 0.3s ease-out, toastFadeOut 0.5s ease-out {duration - 0.5}s forwards;
+        min-width: 300px;
+        max-width: 400px;
+    ">
+        <div style="display: flex; align-items: center; gap: 1rem;">
+            <div style="font-size: 1.5rem;">{icon}</div>
+            <div style="flex: 1; color: #4b5563; font-weight: 500;">{message}</div>
+        </div>
+    </div>
     """, unsafe_allow_html=True)
 
 
+def show_confetti(once_key=None):
+    """
+    Trigger confetti animation for celebrations
+    
+    Args:
+        once_key: If given, only play once per key (e.g. an exam session id) instead of on every rerun
+    """
+    if once_key is not None:
+        if st.session_state.get("confetti_shown_for") == once_key:
+            return
+        st.session_state.confetti_shown_for = once_key
+    
+    st.markdown(CONFETTI_HTML, unsafe_allow_html=True)
+
+
 def show_loading_skeleton(type="card", count=1):
     """
     Display loading skeletons
@@ -188,7 +203,7 @@ def show_modal(title, content, show_close=True):
         display: flex;
         align-items: center;
         justify-content: center;
-        animation: fadeIn 0.3s ease-out;
+        animation: modalFadeIn 0.3s ease-out;
     ">
         <div style="
             background: rgba(255, 255, 255, 0.95);
@@ -198,7 +213,7 @@ def show_modal(title, content, show_close=True):
             max-width: 600px;
             width: 90%;
             box-shadow: 0 25px 50px -12px rgb(0 0 0 / 0.25);
-            animation: scaleIn 0.3s ease-out;
+            animation: modalScaleIn 0.3s ease-out;
         ">
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1.5rem;">
                 <h2 style="margin: 0; color: #232F3E;">{title}</h2>
@@ -209,18 +224,6 @@ def show_modal(title, content, show_close=True):
             </div>
         </div>
     </div>
-    
-    <style>
-    @keyframes fadeIn {{
-        from {{ opacity: 0; }}
-        to {{ opacity: 1; }}
-    }}
-    
-    @keyframes scaleIn {{
-        from {{ transform: scale(0.9); opacity: 0; }}
-        to {{ transform: scale(1); opacity: 1; }}
-    }}
-    </style>
     """, unsafe_allow_html=True)
 
 
@@ -308,26 +311,11 @@ def create_timeline_item(icon, title, description, time, is_completed=True):
 
 def create_quiz_option(letter, text, is_selected=False, is_correct=None, show_result=False):
     """Create a premium quiz option button"""
-    border_color = "#e5e7eb"
-    bg_color = "rgba(255, 255, 255, 0.9)"
-    
-    if show_result:
-        if is_correct:
-            border_color = "#10b981"
-            bg_color = "rgba(16, 185, 129, 0.1)"
-        else:
-            border_color = "#ef4444"
-            bg_color = "rgba(239, 68, 68, 0.1)"
-    elif is_selected:
-        border_color = "#FF9900"
-        bg_color = "rgba(255, 153, 0, 0.1)"
-    
-    result_icon = ""
     if show_result:
-        if is_correct:
-            result_icon = '<span style="color: #10b981; font-size: 1.5rem; margin-left: auto;">✓</span>'
-        else:
-            result_icon = '<span style="color: #ef4444; font-size: 1.5rem; margin-left: auto;">✗</span>'
+        state = "correct" if is_correct else "incorrect"
+    else:
+        state = "selected" if is_selected else "default"
+    bg_color, border_color, result_icon = QUIZ_OPTION_STYLES[state]
     
     return f"""
     <div style="
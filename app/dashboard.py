@@ -4,14 +4,16 @@ Features: AI Chat, Practice Exams, Study Tricks, Answer Evaluation, Q&A Knowledg
 """
 
 import streamlit as st
-import time
 import sys
 import os
 import json
+import time
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from streamlit_option_menu import option_menu
 import logging
 import random
+from operator import itemgetter
 
 
 from database import (
@@ -19,7 +21,7 @@ from database import (
     get_qa_data, log_activity, update_study_time, 
     increment_scenarios_explored, track_exam_completion, check_and_update_streak
 )
-from ai_service import AIService
+from ai_service import get_ai_service, extract_letter
 from valkey_client import get_valkey_client
 from styles import get_custom_css, create_metric_card, create_progress_ring, create_badge, get_confetti_animation
 from components import show_confetti, show_toast, show_loading_skeleton
@@ -35,18 +37,31 @@ logger = logging.getLogger(__name__)
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+@st.cache_data(ttl=300, show_spinner=False)  # Cache for 5 minutes
+def _fetch_user(email: str):
+    """
+    Fetch user data from Snowflake
+    
+    Raises LookupError instead of returning None, since st.cache_data doesn't cache
+    exceptions: a failed lookup (get_user_by_email also returns None on errors) is
+    retried on the next rerun rather than remembered for 5 minutes.
+    """
+    user = get_user_by_email(email)
+    if not user:
+        raise LookupError(email)
+    return {
+        'id': user['ID'],
+        'name': user['NAME'],
+        'email': user['EMAIL'],
+        'target_certification': user['TARGET_CERTIFICATION']
+    }
+
 def get_user_from_db(email: str):
     """Fetch user data from Snowflake with caching"""
     try:
-        user = get_user_by_email(email)
-        if user:
-            return {
-                'id': user['ID'],
-                'name': user['NAME'],
-                'email': user['EMAIL'],
-                'target_certification': user['TARGET_CERTIFICATION']
-            }
+        return _fetch_user(email)
+    except LookupError:
+        pass
     except Exception as e:
         st.error(f"Error fetching user data: {e}")
     return None
@@ -61,12 +76,60 @@ def get_cached_activity_log(user_id: int):
     """Get activity log with caching"""
     return get_activity_log(user_id)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+def invalidate_user_caches(user_id: int):
+    """Drop one user's cached progress and activity after a write, leaving other caches warm"""
+    get_cached_user_progress.clear(user_id)
+    get_cached_activity_log.clear(user_id)
+
+@st.cache_resource
+def get_background_executor():
+    """Shared worker pool for database writes the page doesn't need to wait for"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="background")
+
+@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+def get_cached_qa_index(certification: str):
+    """
+    Load every Q&A scenario for a certification in one Snowflake query and index it
+    
+    Returns:
+        dict: (category, difficulty) -> scenarios, lowercased, with "all" as a wildcard
+              on either side; None if the query failed
+    """
+    qa_set = get_qa_data("All", "All", certification)
+    if qa_set is None:
+        return None
+    
+    index = {}
+    for row in qa_set:
+        category = str(row.CATEGORY).lower()
+        difficulty = str(row.DIFFICULTY).lower()
+        for key in ((category, difficulty), (category, "all"), ("all", difficulty), ("all", "all")):
+            index.setdefault(key, []).append(row)
+    return index
+
 def get_cached_qa_data(category: str, difficulty: str, certification: str):
-    """Get Q&A data with caching"""
-    return get_qa_data(category, difficulty, certification)
+    """Get Q&A data for a category/difficulty from the cached per-certification index"""
+    index = get_cached_qa_index(certification)
+    if index is None:
+        return None
+    return index.get((category.lower(), difficulty.lower()), [])
+
+
+def format_answer_markdown(answer):
+    """Render an answer (single value or list of options) as one markdown string"""
+    if isinstance(answer, list):
+        return "\n".join(f"- {ans}" for ans in answer)
+    return str(answer)
 
 
+# Quick question buttons on the AI chat page
+QUICK_PROMPTS = (
+    "What are the key services I need to know?",
+    "Give me a study plan for this week",
+    "Explain the Well-Architected Framework",
+    "What are common exam traps to avoid?"
+)
+
 def show_ai_chat(user):
     """Premium AI Chat Interface with stunning visuals"""
     
@@ -86,15 +149,8 @@ def show_ai_chat(user):
     # Quick prompts
     st.markdown('<h3 style="margin: 1rem 0;">💡 Quick Questions</h3>', unsafe_allow_html=True)
     
-    quick_prompts = [
-        "What are the key services I need to know?",
-        "Give me a study plan for this week",
-        "Explain the Well-Architected Framework",
-        "What are common exam traps to avoid?"
-    ]
-    
     col1, col2 = st.columns(2)
-    for i, prompt in enumerate(quick_prompts):
+    for i, prompt in enumerate(QUICK_PROMPTS):
         with col1 if i % 2 == 0 else col2:
             if st.button(f"💬 {prompt}", key=f"quick_{i}", use_container_width=True):
                 # Simulate clicking the prompt
@@ -192,7 +248,7 @@ def show_ai_chat(user):
         st.session_state.messages.append({"role": "user", "content": prompt})
         
         # Generate AI response
-        ai_service = AIService()
+        ai_service = get_ai_service()
         try:
             with st.spinner("🧠 AI is thinking..."):
                 response_text = ai_service.answer_question(
@@ -200,7 +256,8 @@ def show_ai_chat(user):
                     prompt,
                     context=user["target_certification"]
                 )
-                save_chat_message(user["id"], prompt, response_text)
+                # Chat history isn't read back on this page, so save it off the request path
+                get_background_executor().submit(save_chat_message, user["id"], prompt, response_text)
 
                 # Log activity
                 log_activity(user["id"], 'chat', f"Asked: {prompt[:50]}...")
@@ -211,8 +268,8 @@ def show_ai_chat(user):
                 # Check and update streak
                 check_and_update_streak(user["id"])
 
-                # Clear cache to update recent activity
-                st.cache_data.clear()
+                # Refresh this user's stats and recent activity
+                invalidate_user_caches(user["id"])
         except Exception as e:
             logger.error(f"Error: {e}")
             response_text = "Sorry, I'm having trouble processing your question. Please try again."
@@ -237,6 +294,31 @@ def show_ai_chat(user):
         ''', unsafe_allow_html=True)
 
 
+# Practice exam session_state keys and their initial values
+EXAM_STATE_DEFAULTS = {
+    "exam_session_id": None,
+    "current_question": None,
+    "question_number": 0,
+    "total_questions": 10,
+    "exam_score": 0,
+    "exam_results": [],
+    "show_explanation": False,
+    "current_answer_result": None,
+    "exam_finished": False
+}
+
+def init_exam_state(reset=False):
+    """
+    Set practice exam session_state to its defaults
+    
+    Args:
+        reset: Overwrite existing values (end of exam) instead of only filling in missing keys
+    """
+    for key, default in EXAM_STATE_DEFAULTS.items():
+        if reset or key not in st.session_state:
+            st.session_state[key] = list(default) if isinstance(default, list) else default
+
+
 def show_practice_exam(user):
     """Premium Practice Exam Interface with immersive experience"""
     
@@ -254,28 +336,11 @@ def show_practice_exam(user):
     st.write("")
     
     # Initialize session state variables
-    if "exam_session_id" not in st.session_state:
-        st.session_state.exam_session_id = None
-    if "current_question" not in st.session_state:
-        st.session_state.current_question = None
-    if "question_number" not in st.session_state:
-        st.session_state.question_number = 0
-    if "total_questions" not in st.session_state:
-        st.session_state.total_questions = 10
-    if "exam_score" not in st.session_state:
-        st.session_state.exam_score = 0
-    if "exam_results" not in st.session_state:
-        st.session_state.exam_results = []
-    if "show_explanation" not in st.session_state:
-        st.session_state.show_explanation = False
-    if "current_answer_result" not in st.session_state:
-        st.session_state.current_answer_result = None
-    if "exam_finished" not in st.session_state:
-        st.session_state.exam_finished = False
+    init_exam_state()
     
     # Get Valkey client
     valkey = get_valkey_client()
-    ai_service = AIService()
+    ai_service = get_ai_service()
     
     # Initialize done flag for cleanup logic
     done = False
@@ -354,10 +419,12 @@ def show_practice_exam(user):
         # Start Exam button (only show when no exam is active)
         if st.button("🚀 Start Exam", type="primary", use_container_width=True):
             # Generate unique session ID
-            session_id = f"exam_{user['id']}_{int(datetime.now().timestamp())}"
+            started_at = datetime.now()
+            session_id = f"exam_{user['id']}_{int(started_at.timestamp())}"
             
             # Clear any existing queue
             valkey.clear_queue(session_id)
+            st.session_state.pop("next_question", None)
             
             # Create session data
             session_data = {
@@ -369,7 +436,7 @@ def show_practice_exam(user):
                 "total_questions": num_questions,
                 "score": 0,
                 "answers": [],
-                "started_at": datetime.now().isoformat()
+                "started_at": started_at.isoformat()
             }
             
             # Save session to Valkey
@@ -387,18 +454,8 @@ def show_practice_exam(user):
                 if success:
                     st.info("⏳ Generating first question...")
                     
-                    # Wait for first question (with timeout)
-                    max_wait = 30  # 30 seconds max
-                    wait_interval = 1  # Check every 1 second
-                    waited = 0
-                    
-                    question_data = None
-                    while waited < max_wait:
-                        question_data = valkey.pop_question(session_id)
-                        if question_data:
-                            break
-                        time.sleep(wait_interval)
-                        waited += wait_interval
+                    # Wait for first question (blocks until it's pushed, 30 seconds max)
+                    question_data = valkey.blocking_pop_question(session_id, timeout=30)
                     
                     if question_data:
                         # Success! Start exam
@@ -427,7 +484,6 @@ def show_practice_exam(user):
         
         # Exam header with progress
         progress = st.session_state.question_number / st.session_state.total_questions
-        queue_length = valkey.get_queue_length(session_id)
         
         st.markdown(f'''
         <div class="glass-card" style="padding: 1.5rem; margin-bottom: 1rem;">
@@ -492,10 +548,11 @@ def show_practice_exam(user):
             if not st.session_state.show_explanation and not done:
                 if question_type == "multiple":
                     st.info("ℹ️ Select ALL that apply (multiple correct answers)")
-                    user_answers = []
-                    for option in options:
-                        if st.checkbox(option, key=f"option_{option}"):
-                            user_answers.append(option)
+                    user_answers = st.multiselect(
+                        "Select your answers:",
+                        options,
+                        key=f"multi_answer_{st.session_state.question_number}"
+                    )
                     
                     st.write("")
                     col1, col2 = st.columns([3, 1])
@@ -590,14 +647,6 @@ def show_practice_exam(user):
                     
                     st.write("")
                     
-                    # Helper function to extract letter from option
-                    def extract_letter(text):
-                        """Extract letter (A, B, C, D) from option text"""
-                        text_str = str(text).strip().upper()
-                        if ')' in text_str:
-                            return text_str.split(')')[0].strip()
-                        return text_str[0] if text_str else ''
-                    
                     # Get user's answer and correct answer
                     user_answer = st.session_state.exam_results[-1].get("user_answer")
                     correct_answer = result.get("correct_answer")
@@ -717,9 +766,16 @@ def show_practice_exam(user):
                     
                     # Next question or finish
                     if st.session_state.question_number < st.session_state.total_questions and not done:
+                        # Prefetch the next question once, while the user reads the explanation
+                        # (a non-blocking pop: n8n has usually queued it already)
+                        if "next_question" not in st.session_state:
+                            st.session_state.next_question = valkey.pop_question(session_id)
+                        
                         if st.button("➡️ Next Question", type="primary", use_container_width=True):
-                            # Get next question from queue (instant!)
-                            next_question = valkey.pop_question(session_id)
+                            # Queue was still empty when prefetching: wait briefly for the question
+                            next_question = st.session_state.pop("next_question")
+                            if next_question is None:
+                                next_question = valkey.blocking_pop_question(session_id, timeout=5)
                             
                             if next_question:
                                 st.session_state.current_question = next_question
@@ -728,9 +784,7 @@ def show_practice_exam(user):
                                 st.session_state.current_answer_result = None
                                 st.rerun()
                             else:
-                                st.warning("⏳ Waiting for next question... (generating in background)")
-                                time.sleep(2)
-                                st.rerun()
+                                st.warning("⏳ Next question is still generating in the background. Please try again in a moment.")
                     else:
                         # Last question - show finish button if not already finished
                         if not st.session_state.exam_finished:
@@ -743,32 +797,34 @@ def show_practice_exam(user):
                                     from database import execute_update
                                     session_data = valkey.get_session(session_id)
                                     if session_data:
-                                        # Calculate exam duration
-                                        duration_minutes = int((datetime.now() - datetime.fromisoformat(session_data.get('started_at'))).seconds / 60)
+                                        # Calculate exam duration (total_seconds: .seconds drops whole days)
+                                        completed_at = datetime.now()
+                                        started_at = session_data.get('started_at')
+                                        duration_minutes = int((completed_at - datetime.fromisoformat(started_at)).total_seconds() // 60)
                                         
                                         # Save exam session
-                                        query = f"""
+                                        query = """
                                         INSERT INTO exam_sessions (
                                             session_id, user_id, certification, difficulty, topic,
                                             total_questions, correct_answers, incorrect_answers,
                                             percentage, passed, started_at, completed_at, duration_minutes
-                                        ) VALUES (
-                                            '{session_id}',
-                                            {user['id']},
-                                            '{user['target_certification']}',
-                                            '{session_data.get('difficulty', 'medium')}',
-                                            '{session_data.get('topic', 'All Topics')}',
-                                            {st.session_state.total_questions},
-                                            {st.session_state.exam_score},
-                                            {st.session_state.total_questions - st.session_state.exam_score},
-                                            {score_percentage},
-                                            {str(score_percentage >= 70).upper()},
-                                            '{session_data.get('started_at')}',
-                                            '{datetime.now().isoformat()}',
-                                            {duration_minutes}
-                                        )
+                                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                                         """
-                                        execute_update(query)
+                                        execute_update(query, (
+                                            session_id,
+                                            user['id'],
+                                            user['target_certification'],
+                                            session_data.get('difficulty', 'medium'),
+                                            session_data.get('topic', 'All Topics'),
+                                            st.session_state.total_questions,
+                                            st.session_state.exam_score,
+                                            st.session_state.total_questions - st.session_state.exam_score,
+                                            score_percentage,
+                                            score_percentage >= 70,
+                                            started_at,
+                                            completed_at.isoformat(),
+                                            duration_minutes
+                                        ))
 
                                         # Log activity
                                         log_activity(
@@ -790,8 +846,8 @@ def show_practice_exam(user):
                                             score_percentage >= 70
                                         )
 
-                                        # Clear cache to show updated stats
-                                        st.cache_data.clear()
+                                        # Refresh this user's stats and recent activity
+                                        invalidate_user_caches(user['id'])
                                 except Exception as e:
                                     logger.error(f"Could not save results to database: {e}")
                                     
@@ -810,8 +866,8 @@ def show_practice_exam(user):
             # Calculate final score for celebration message
             score_percentage_display = (st.session_state.exam_score / st.session_state.total_questions) * 100
 
-            # Show confetti celebration
-            show_confetti()
+            # Show confetti celebration (once per exam, not on every rerun of the results page)
+            show_confetti(once_key=st.session_state.exam_session_id)
 
             # Show personalized message based on score
             if score_percentage_display >= 90:
@@ -879,32 +935,17 @@ def show_practice_exam(user):
                     </div>
                     ''', unsafe_allow_html=True)
                     
-                    # Question
-                    st.markdown("**Question:**")
-                    st.write(result['question'])
-                    st.write("")
+                    # Question (one markdown block per section instead of a write per line)
+                    st.markdown(f"**Question:**\n\n{result['question']}")
                     
                     # Answers side by side
                     col1, col2 = st.columns(2)
                     with col1:
-                        st.markdown("**Your Answer:**")
-                        user_ans = result['user_answer']
-                        if isinstance(user_ans, list):
-                            for ans in user_ans:
-                                st.write(f"- {ans}")
-                        else:
-                            st.write(user_ans)
+                        st.markdown(f"**Your Answer:**\n\n{format_answer_markdown(result['user_answer'])}")
                     
                     with col2:
-                        st.markdown("**Correct Answer:**")
-                        correct_ans = result['correct_answer']
-                        if isinstance(correct_ans, list):
-                            for ans in correct_ans:
-                                st.write(f"- {ans}")
-                        else:
-                            st.write(correct_ans)
+                        st.markdown(f"**Correct Answer:**\n\n{format_answer_markdown(result['correct_answer'])}")
                     
-                    st.write("")
                     st.markdown("**💡 Explanation:**")
                     st.info(result['explanation'])
             
@@ -925,14 +966,12 @@ def show_practice_exam(user):
         if done:
             # Clean up - notify n8n to stop generating questions
             try:
-                data = {
-                    "action": "quit_session",
-                    "session_id": session_id,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                result = ai_service._call_n8n_webhook(ai_service.exam_webhook, data, async_call=False)
-                if result and result.get("error"):
-                    logger.warning(f"Warning: Could not notify n8n: {result.get('error')}")
+                data = ai_service._payload(
+                    action="quit_session",
+                    session_id=session_id
+                )
+                # Just a stop signal: send it from the background pool, nothing waits on the reply
+                ai_service._call_n8n_webhook(ai_service.exam_webhook, data, async_call=True)
             except Exception as e:
                 logger.warning(f"Warning: Failed to notify n8n about session cleanup: {e}")
             
@@ -943,17 +982,23 @@ def show_practice_exam(user):
                 logger.warning(f"Warning: Could not delete Valkey session: {e}")
             
             # Reset all session state
-            st.session_state.exam_session_id = None
-            st.session_state.current_question = None
-            st.session_state.question_number = 0
-            st.session_state.exam_score = 0
-            st.session_state.exam_results = []
-            st.session_state.show_explanation = False
-            st.session_state.current_answer_result = None
-            st.session_state.exam_finished = False
+            st.session_state.pop("next_question", None)
+            init_exam_state(reset=True)
             st.rerun()
 
 
+# (topic, icon) pairs shown under Popular Topics on the study tricks page
+POPULAR_TOPICS = (
+    ("S3 Storage Classes", "🗄️"),
+    ("EC2 Instance Types", "💻"),
+    ("VPC Components", "🌐"),
+    ("IAM Policies", "🔐"),
+    ("Lambda Limits", "⚡"),
+    ("RDS vs DynamoDB", "🗃️"),
+    ("CloudFormation vs Terraform", "🏗️"),
+    ("Security Best Practices", "🛡️")
+)
+
 def show_study_tricks(user):
     """Premium Study Tricks Section with interactive cards"""
     
@@ -985,7 +1030,7 @@ def show_study_tricks(user):
     
     if generate_btn and topic:
         with st.spinner("🔍 Creating memory techniques..."):
-            ai_service = AIService()
+            ai_service = get_ai_service()
             try:
                 tricks = ai_service.get_study_tricks(
                     user["id"],
@@ -998,6 +1043,7 @@ def show_study_tricks(user):
                 update_study_time(user["id"], 5)  # Estimate 5 minutes per trick session
                 check_and_update_streak(user["id"])
                 log_activity(user["id"], 'tricks', f"Generated memory tricks for: {topic}")
+                invalidate_user_caches(user["id"])
                 
                 st.rerun()
             except Exception as e:
@@ -1079,19 +1125,8 @@ def show_study_tricks(user):
     st.write("")
     st.markdown('<h2 style="margin: 2rem 0 1rem 0;">🔥 Popular Topics</h2>', unsafe_allow_html=True)
     
-    popular_topics = [
-        ("S3 Storage Classes", "🗄️"),
-        ("EC2 Instance Types", "💻"),
-        ("VPC Components", "🌐"),
-        ("IAM Policies", "🔐"),
-        ("Lambda Limits", "⚡"),
-        ("RDS vs DynamoDB", "🗃️"),
-        ("CloudFormation vs Terraform", "🏗️"),
-        ("Security Best Practices", "🛡️")
-    ]
-    
     cols = st.columns(4)
-    for i, (topic, icon) in enumerate(popular_topics):
+    for i, (topic, icon) in enumerate(POPULAR_TOPICS):
         with cols[i % 4]:
             st.markdown(f'''
             <div class="glass-card" style="text-align: center; padding: 1rem; cursor: pointer; transition: all 0.3s ease;">
@@ -1104,6 +1139,15 @@ def show_study_tricks(user):
                 st.rerun()
 
 
+# Example questions offered on the answer evaluation page
+EVALUATION_EXAMPLES = (
+    "Explain the difference between S3 and EBS",
+    "What are the benefits of using AWS Lambda?",
+    "Describe the shared responsibility model in AWS",
+    "How does Auto Scaling work in AWS?",
+    "What is the difference between Security Groups and NACLs?"
+)
+
 def show_answer_evaluation(user):
     """Premium Answer Evaluation with detailed feedback"""
     
@@ -1130,14 +1174,7 @@ def show_answer_evaluation(user):
     
     # Example questions
     with st.expander("📚 Example Questions"):
-        examples = [
-            "Explain the difference between S3 and EBS",
-            "What are the benefits of using AWS Lambda?",
-            "Describe the shared responsibility model in AWS",
-            "How does Auto Scaling work in AWS?",
-            "What is the difference between Security Groups and NACLs?"
-        ]
-        for ex in examples:
+        for ex in EVALUATION_EXAMPLES:
             if st.button(f"Use: {ex}", key=f"ex_{ex}"):
                 question = ex
                 st.rerun()
@@ -1165,7 +1202,7 @@ def show_answer_evaluation(user):
             st.warning("Please provide both a question and your answer!")
         else:
             with st.spinner("🤔 Evaluating your answer..."):
-                ai_service = AIService()
+                ai_service = get_ai_service()
                 try:
                     evaluation = ai_service.evaluate_answer(
                         user["id"],
@@ -1179,6 +1216,7 @@ def show_answer_evaluation(user):
                     update_study_time(user["id"], 5)  # Estimate 5 minutes per evaluation
                     check_and_update_streak(user["id"])
                     log_activity(user["id"], 'evaluation', f"Answer evaluated: {question[:50]}...")
+                    invalidate_user_caches(user["id"])
                     
                     st.rerun()
                 except Exception as e:
@@ -1221,6 +1259,70 @@ def show_answer_evaluation(user):
                 st.write(eval_data["model_answer"])
 
 
+# Filter choices on the Q&A knowledge base page
+QA_CATEGORIES = ("All", "Storage", "Compute", "Networking", "Security", "Database", "Monitoring")
+QA_DIFFICULTIES = ("All", "Easy", "Medium", "Hard")
+
+@st.fragment
+def show_qa_scenario(user, qa_data):
+    """
+    Render the current Q&A scenario with its Previous/Next buttons
+    
+    Runs as a fragment: stepping through scenarios reruns only this block instead of
+    the whole page (sidebar, progress lookups, filters).
+    """
+    current_question = st.session_state.qa_current_question
+
+    # Track scenario view if not already tracked for this scenario
+    if "qa_tracked_scenarios" not in st.session_state:
+        st.session_state.qa_tracked_scenarios = set()
+
+    scenario_id = qa_data[current_question].SCENARIO_ID
+    if scenario_id not in st.session_state.qa_tracked_scenarios:
+        # Track this scenario exploration
+        increment_scenarios_explored(user['id'])
+        update_study_time(user['id'], 3)  # Estimate 3 minutes per scenario
+        check_and_update_streak(user['id'])
+        log_activity(user['id'], 'qna', f"Explored scenario: {qa_data[current_question].TITLE[:50]}...")
+        st.session_state.qa_tracked_scenarios.add(scenario_id)
+        # Clear only the stats caches; the Q&A set itself hasn't changed
+        invalidate_user_caches(user['id'])
+
+    if current_question < len(qa_data):
+        scenario = qa_data[current_question]
+        st.markdown(
+            f"**Scenario:** {scenario.SCENARIO_TEXT}\n\n"
+            f"**Challenge Question:** {scenario.CHALLENGE_QUESTION}"
+        )
+
+        # Fold this 
+        with st.expander(f"Check the answer"):
+            st.markdown(
+                f"**Solution Answer:** {scenario.SOLUTION_ANSWER}\n\n"
+                f"**Best Practices:** {scenario.BEST_PRACTICES}\n\n"
+                f"**AWS Services Used:** {scenario.AWS_SERVICES_USED}\n\n"
+                f"**Architecture Considerations:** {scenario.ARCHITECTURE_CONSIDERATIONS}\n\n"
+                f"**Cost Optimization Tips:** {scenario.COST_OPTIMIZATION_TIPS}\n\n"
+                f"**Security Considerations:** {scenario.SECURITY_CONSIDERATIONS}"
+            )
+
+        # Navigation buttons
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if current_question > 0 and st.button("⬅️ Previous", key="qa_previous"):
+                st.session_state.qa_current_question -= 1
+                st.rerun(scope="fragment")
+        with col2:
+            if st.button("Next ➡️", key="qa_next"):
+                random_index = random.randint(0, len(qa_data) - 1)
+                while random_index == current_question:
+                    random_index = random.randint(0, len(qa_data) - 1)
+                st.session_state.qa_current_question = random_index
+                st.rerun(scope="fragment")
+
+        # Show question counter
+        st.info(f"Question {current_question + 1} of {len(qa_data)}")
+
 def show_qna_knowledge_base(user):
     """Premium Q&A Knowledge Base with search"""
     
@@ -1240,10 +1342,8 @@ def show_qna_knowledge_base(user):
     # Search
     
     # Categories
-    categories = ["All", "Storage", "Compute", "Networking", "Security", "Database", "Monitoring"]
-    difficulty = ["All", "Easy", "Medium", "Hard"]
-    selected_category = st.selectbox("Select a category:", categories)
-    selected_difficulty = st.selectbox("Select a difficulty:", difficulty)
+    selected_category = st.selectbox("Select a category:", QA_CATEGORIES)
+    selected_difficulty = st.selectbox("Select a difficulty:", QA_DIFFICULTIES)
     
     # Use cached Q&A data for better performance
     qa_data = get_cached_qa_data(selected_category, selected_difficulty, user['target_certification'].split(" - ")[0])
@@ -1255,52 +1355,78 @@ def show_qna_knowledge_base(user):
     # Diplay question randomly from the qa_data
     # Display current question if we have data
     if qa_data and len(qa_data) > 0:
-        current_question = st.session_state.qa_current_question
-        
-        # Track scenario view if not already tracked for this scenario
-        if "qa_tracked_scenarios" not in st.session_state:
-            st.session_state.qa_tracked_scenarios = set()
-        
-        scenario_id = qa_data[current_question].SCENARIO_ID
-        if scenario_id not in st.session_state.qa_tracked_scenarios:
-            # Track this scenario exploration
-            increment_scenarios_explored(user['id'])
-            update_study_time(user['id'], 3)  # Estimate 3 minutes per scenario
-            check_and_update_streak(user['id'])
-            log_activity(user['id'], 'qna', f"Explored scenario: {qa_data[current_question].TITLE[:50]}...")
-            st.session_state.qa_tracked_scenarios.add(scenario_id)
-            # Clear cache to update stats
-            st.cache_data.clear()
-        
-        if current_question < len(qa_data):
-            st.write(f"**Scenario:** {qa_data[current_question].SCENARIO_TEXT}")
-            st.write(f"**Challenge Question:** {qa_data[current_question].CHALLENGE_QUESTION}")
-
-            # Fold this 
-            with st.expander(f"Check the answer"):
-                st.write(f"**Solution Answer:** {qa_data[current_question].SOLUTION_ANSWER}")
-                st.write(f"**Best Practices:** {qa_data[current_question].BEST_PRACTICES}")
-                st.write(f"**AWS Services Used:** {qa_data[current_question].AWS_SERVICES_USED}")
-                st.write(f"**Architecture Considerations:** {qa_data[current_question].ARCHITECTURE_CONSIDERATIONS}")
-                st.write(f"**Cost Optimization Tips:** {qa_data[current_question].COST_OPTIMIZATION_TIPS}")
-                st.write(f"**Security Considerations:** {qa_data[current_question].SECURITY_CONSIDERATIONS}")
-
-            # Navigation buttons
-            col1, col2 = st.columns([1, 1])
-            with col1:
-                if current_question > 0 and st.button("⬅️ Previous", key="qa_previous"):
-                    st.session_state.qa_current_question -= 1
-                    st.rerun()
-            with col2:
-                if st.button("Next ➡️", key="qa_next"):
-                    random_index = random.randint(0, len(qa_data) - 1)
-                    while random_index == current_question:
-                        random_index = random.randint(0, len(qa_data) - 1)
-                    st.session_state.qa_current_question = random_index
-                    st.rerun()
-            
-            # Show question counter
-            st.info(f"Question {current_question + 1} of {len(qa_data)}")
+        show_qa_scenario(user, qa_data)
+
+# Icons for the Topic Mastery cards
+TOPIC_ICONS = {
+    "Storage Services": "🗄️",
+    "Compute Services": "💻",
+    "Networking & Content Delivery": "🌐",
+    "Security, Identity & Compliance": "🔒",
+    "Database Services": "🗃️",
+    "Management & Governance": "⚙️",
+    "Application Integration": "🔗",
+    "Analytics & Big Data": "📊",
+    "Machine Learning & AI": "🤖",
+    "Developer Tools & DevOps": "🛠️",
+    "Migration & Transfer": "📦",
+    "Cost Management": "💰",
+    "Serverless Computing": "⚡",
+    "Containers": "📦",
+    "High Availability & Fault Tolerance": "🔄",
+    "Well-Architected Framework": "🏛️",
+    "Hybrid Cloud & Edge": "🌍"
+}
+
+# Icons for Recent Activity entries, by activity_log action
+ACTIVITY_ICONS = {"exam": "📝", "chat": "💬", "tricks": "🧠", "login": "🔐"}
+
+def format_relative_time(age_seconds):
+    """
+    Convert an activity's age to a relative time string
+    
+    Args:
+        age_seconds: Seconds since the activity, computed by Snowflake against its own
+                     clock (CREATED_AT is stored without a timezone, so comparing it
+                     to datetime.now() here would be off by the session/server offset)
+    
+    Returns:
+        str: e.g. "Just now", "5 minutes ago", "2 days ago"
+    """
+    if age_seconds is None:
+        return "Unknown time"
+
+    seconds = max(int(age_seconds), 0)
+    days, seconds = divmod(seconds, 86400)
+
+    if days > 0:
+        if days == 1:
+            return "1 day ago"
+        elif days < 7:
+            return f"{days} days ago"
+        elif days < 30:
+            weeks = days // 7
+            return f"{weeks} week{'s' if weeks > 1 else ''} ago"
+        else:
+            months = days // 30
+            return f"{months} month{'s' if months > 1 else ''} ago"
+    elif seconds >= 3600:
+        hours = seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    elif seconds >= 60:
+        minutes = seconds // 60
+        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+    else:
+        return "Just now"
+
+# Scalar progress metrics read in one pass (missing keys default to 0)
+PROGRESS_METRIC_KEYS = (
+    "STUDY_TIME_MINUTES", "PRACTICE_TESTS_TAKEN", "AVERAGE_SCORE", "STREAK",
+    "LONGEST_STREAK", "XP", "ACCURACY_PERCENTAGE", "SCENARIOS_EXPLORED",
+    "TOTAL_QUESTIONS_ANSWERED", "CORRECT_ANSWERS",
+)
+PROGRESS_METRIC_DEFAULTS = dict.fromkeys(PROGRESS_METRIC_KEYS, 0)
+get_progress_metrics = itemgetter(*PROGRESS_METRIC_KEYS)
 
 def show_progress_dashboard(user):
     """Premium Progress Dashboard with stunning visuals and animations"""
@@ -1309,7 +1435,7 @@ def show_progress_dashboard(user):
     col1, col2 = st.columns([6, 1])
     with col2:
         if st.button("🔄 Refresh", use_container_width=True):
-            st.cache_data.clear()
+            invalidate_user_caches(user["id"])
             st.rerun()
 
     progress_data = get_cached_user_progress(user["id"])
@@ -1339,13 +1465,17 @@ def show_progress_dashboard(user):
     st.write("")
 
     if progress_data:
-        study_time_minutes = int(progress_data.get("STUDY_TIME_MINUTES", 0))
+        (
+            study_time_minutes, practice_tests_taken, average_score, streak,
+            longest_streak, xp, accuracy_percentage, scenarios_explored,
+            total_questions_answered, correct_answers,
+        ) = get_progress_metrics({**PROGRESS_METRIC_DEFAULTS, **progress_data})
+        study_time_minutes = int(study_time_minutes)
+        average_score = int(average_score)
+        accuracy_percentage = int(accuracy_percentage)
         study_time_hours = study_time_minutes // 60
         study_time_remaining_minutes = study_time_minutes % 60
         
-        practice_tests_taken = progress_data.get("PRACTICE_TESTS_TAKEN", 0)
-        average_score = int(progress_data.get("AVERAGE_SCORE", 0))
-        
         # Parse topic arrays
         import json
         from utils import get_topics_for_certification
@@ -1386,14 +1516,6 @@ def show_progress_dashboard(user):
                     return int((topic_scores[idx] / topic_questions[idx]) * 100)
             return 0
 
-        streak = progress_data.get("STREAK", 0)
-        longest_streak = progress_data.get("LONGEST_STREAK", 0)
-        xp = progress_data.get("XP", 0)
-        accuracy_percentage = int(progress_data.get("ACCURACY_PERCENTAGE", 0))
-        scenarios_explored = progress_data.get("SCENARIOS_EXPLORED", 0)
-        total_questions_answered = progress_data.get("TOTAL_QUESTIONS_ANSWERED", 0)
-        correct_answers = progress_data.get("CORRECT_ANSWERS", 0)
-        
         # Animated Metric Cards with tooltips
         col1, col2, col3, col4 = st.columns(4, gap="medium")
 
@@ -1476,50 +1598,30 @@ def show_progress_dashboard(user):
         # Topic Mastery with Circular Progress
         st.markdown('<h2 style="margin: 2rem 0 1rem 0;">📈 Topic Mastery</h2>', unsafe_allow_html=True)
         
-        # Topic icons mapping
-        topic_icons = {
-            "Storage Services": "🗄️",
-            "Compute Services": "💻",
-            "Networking & Content Delivery": "🌐",
-            "Security, Identity & Compliance": "🔒",
-            "Database Services": "🗃️",
-            "Management & Governance": "⚙️",
-            "Application Integration": "🔗",
-            "Analytics & Big Data": "📊",
-            "Machine Learning & AI": "🤖",
-            "Developer Tools & DevOps": "🛠️",
-            "Migration & Transfer": "📦",
-            "Cost Management": "💰",
-            "Serverless Computing": "⚡",
-            "Containers": "📦",
-            "High Availability & Fault Tolerance": "🔄",
-            "Well-Architected Framework": "🏛️",
-            "Hybrid Cloud & Edge": "🌍"
-        }
-        
         # Build topic display data
         topics_display = []
         for i, topic_name in enumerate(tracked_topics):
             if i < len(topic_scores) and i < len(topic_questions):
                 progress = safe_calc_progress(i)
-                icon = topic_icons.get(topic_name, "📚")
+                icon = TOPIC_ICONS.get(topic_name, "📚")
                 # Shorten topic name for display
                 display_name = topic_name.replace(" Services", "").replace(" & ", "/")
                 topics_display.append((display_name, progress, icon, topic_questions[i]))
         
-        # Display in 3 rows of 2 columns each (6 topics total)
-        for row in range(2):
-            cols = st.columns(3)
-            for col_idx in range(3):
-                topic_idx = row * 3 + col_idx
-                if topic_idx < len(topics_display):
-                    topic, progress, icon, total_q = topics_display[topic_idx]
-                    with cols[col_idx]:
-                        st.markdown(f'''
-                        <div class="glass-card" style="text-align: center; padding: 1.5rem;">
-                            <div style="font-size: 2.5rem; margin-bottom: 0.5rem;">{icon}</div>
-                            {create_progress_ring(progress, topic, 100)}
-                        ''', unsafe_allow_html=True)
+        # Display up to 6 topics in a 3-column grid, sent as a single element
+        # (no blank lines between cards: a blank line would end the markdown HTML block)
+        topic_cards = "\n".join(
+            f'''<div class="glass-card" style="text-align: center; padding: 1.5rem;">
+                <div style="font-size: 2.5rem; margin-bottom: 0.5rem;">{icon}</div>
+                {create_progress_ring(progress, topic, 100).strip()}
+            </div>'''
+            for topic, progress, icon, total_q in topics_display[:6]
+        )
+        st.markdown(f'''
+        <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem;">
+            {topic_cards}
+        </div>
+        ''', unsafe_allow_html=True)
         
         st.write("")
 
@@ -1537,46 +1639,22 @@ def show_progress_dashboard(user):
     st.markdown('<h2 style="margin: 2rem 0 1rem 0;">📝 Recent Activity</h2>', unsafe_allow_html=True)
 
     if activity_data and len(activity_data) > 0:
-        def get_relative_time(timestamp):
-            """Convert timestamp to relative time string"""
-            if not timestamp:
-                return "Unknown time"
-
-            now = datetime.now()
-            diff = now - timestamp
-
-            if diff.days > 0:
-                if diff.days == 1:
-                    return "1 day ago"
-                elif diff.days < 7:
-                    return f"{diff.days} days ago"
-                elif diff.days < 30:
-                    weeks = diff.days // 7
-                    return f"{weeks} week{'s' if weeks > 1 else ''} ago"
-                else:
-                    months = diff.days // 30
-                    return f"{months} month{'s' if months > 1 else ''} ago"
-            elif diff.seconds >= 3600:
-                hours = diff.seconds // 3600
-                return f"{hours} hour{'s' if hours > 1 else ''} ago"
-            elif diff.seconds >= 60:
-                minutes = diff.seconds // 60
-                return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            else:
-                return "Just now"
-
+        # Build all rows first and send them as one element
+        # (no blank lines between cards: a blank line would end the markdown HTML block)
+        activity_cards = []
         for activity in activity_data:
             activity_type = activity.get('ACTIVITY', 'activity')
             description = activity.get('DESCRIPTION', 'No description')
-            created_at = activity.get('CREATED_AT')
+            age_seconds = activity.get('AGE_SECONDS')
+            if age_seconds is not None:
+                # The row may come from the 1-minute cache: age it by the time since the query
+                age_seconds += time.time() - activity.get('QUERIED_AT', time.time())
 
-            icon_map = {"exam": "📝", "chat": "💬", "tricks": "🧠", "login": "🔐"}
-            icon = icon_map.get(activity_type, "📌")
+            icon = ACTIVITY_ICONS.get(activity_type, "📌")
 
-            relative_time = get_relative_time(created_at)
+            relative_time = format_relative_time(age_seconds)
 
-            st.markdown(f'''
-            <div class="glass-card" style="padding: 1rem;">
+            activity_cards.append(f'''<div class="glass-card" style="padding: 1rem;">
                 <div style="display: flex; align-items: center; gap: 1rem;">
                     <div style="font-size: 2rem;">{icon}</div>
                     <div style="flex: 1;">
@@ -1588,9 +1666,14 @@ def show_progress_dashboard(user):
                         </div>
                     </div>
                 </div>
-            </div>
-            ''', unsafe_allow_html=True)
-            st.write("")
+            </div>''')
+
+        activity_html = "\n".join(activity_cards)
+        st.markdown(f'''
+        <div style="display: flex; flex-direction: column; gap: 1rem;">
+            {activity_html}
+        </div>
+        ''', unsafe_allow_html=True)
     else:
         st.markdown('''
         <div class="glass-card" style="text-align: center; padding: 2rem;">
@@ -1599,6 +1682,43 @@ def show_progress_dashboard(user):
         </div>
         ''', unsafe_allow_html=True)
 
+# Sidebar navigation: section name -> page renderer, and the menu icon for each
+NAV_SECTION_PAGES = {
+    "Progress Dashboard": show_progress_dashboard,
+    "AI Study Coach": show_ai_chat,
+    "Practice Exams": show_practice_exam,
+    "Study Tricks": show_study_tricks,
+    "Answer Evaluation": show_answer_evaluation,
+    "Q&A Knowledge Base": show_qna_knowledge_base
+}
+NAV_MENU_OPTIONS = list(NAV_SECTION_PAGES)
+NAV_MENU_ICONS = ["speedometer2", "robot", "pencil-square", "lightbulb-fill", "check2-square", "question-circle-fill"]
+
+# Sidebar navigation menu styling (streamlit-option-menu)
+NAV_MENU_STYLES = {
+    "container": {"padding": "0", "background-color": "transparent"},
+    "icon": {"color": "#FF9900", "font-size": "1.2rem"}, 
+    "icon-selected": {"color": "white"},
+    "nav-link": {
+        "color": "#000000",
+        "font-size": "0.95rem",
+        "font-weight": "700",
+        "text-align": "left",
+        "margin": "0.25rem 0",
+        "padding": "0.75rem 1rem",
+        "border-radius": "0.5rem",
+        "transition": "all 0.3s ease",
+        "background-color": "rgba(255, 255, 255, 0.05)",
+    },
+    "nav-link-selected": {
+        "background": "linear-gradient(135deg, #222222 0%, #DB6100 100%)",
+        "color": "white",
+        "font-weight": "700",
+        "box-shadow": "0 4px 6px rgba(0, 0, 0, 0.2)",
+        "icon-color": "white",
+    },
+}
+
 def show_dashboard():
     """Premium Dashboard with World-Class Navigation"""
 
@@ -1691,33 +1811,11 @@ def show_dashboard():
         
         section = option_menu(
             menu_title=None,
-            options=["Progress Dashboard", "AI Study Coach", "Practice Exams", "Study Tricks", "Answer Evaluation", "Q&A Knowledge Base"],
-            icons=["speedometer2", "robot", "pencil-square", "lightbulb-fill", "check2-square", "question-circle-fill"],
+            options=NAV_MENU_OPTIONS,
+            icons=NAV_MENU_ICONS,
             menu_icon="cast",
             default_index=0,
-            styles={
-                "container": {"padding": "0", "background-color": "transparent"},
-                "icon": {"color": "#FF9900", "font-size": "1.2rem"}, 
-                "icon-selected": {"color": "white"},
-                "nav-link": {
-                    "color": "#000000",
-                    "font-size": "0.95rem",
-                    "font-weight": "700",
-                    "text-align": "left",
-                    "margin": "0.25rem 0",
-                    "padding": "0.75rem 1rem",
-                    "border-radius": "0.5rem",
-                    "transition": "all 0.3s ease",
-                    "background-color": "rgba(255, 255, 255, 0.05)",
-                },
-                "nav-link-selected": {
-                    "background": "linear-gradient(135deg, #222222 0%, #DB6100 100%)",
-                    "color": "white",
-                    "font-weight": "700",
-                    "box-shadow": "0 4px 6px rgba(0, 0, 0, 0.2)",
-                    "icon-color": "white",
-                },
-            }
+            styles=NAV_MENU_STYLES
         )
         
         st.markdown("---")
@@ -1729,6 +1827,9 @@ def show_dashboard():
             st.info("Settings coming soon!")
         
         if st.button("🚪 Logout", use_container_width=True, type="primary"):
+            # Drop this user's cached rows so the next login reads fresh data
+            _fetch_user.clear(st.session_state.user_email)
+            invalidate_user_caches(user["id"])
             st.session_state.authenticated = False
             st.session_state.page = "home"
             st.rerun()
@@ -1750,18 +1851,7 @@ def show_dashboard():
     
     # Display selected section
     try:
-        if section == "Progress Dashboard":
-            show_progress_dashboard(user)
-        elif section == "AI Study Coach":
-            show_ai_chat(user)
-        elif section == "Practice Exams":
-            show_practice_exam(user)
-        elif section == "Study Tricks":
-            show_study_tricks(user)
-        elif section == "Answer Evaluation":
-            show_answer_evaluation(user)
-        elif section == "Q&A Knowledge Base":
-            show_qna_knowledge_base(user)
+        NAV_SECTION_PAGES[section](user)
     except Exception as e:
         logger.error(f"Error displaying section '{section}': {str(e)}", exc_info=True)
         st.error(f"❌ An error occurred: {str(e)}\n\nCheck logs for detailed traceback.")
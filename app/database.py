@@ -4,7 +4,9 @@ Uses Snowflake for data storage (integrates seamlessly with Streamlit Cloud)
 """
 
 import os
+import time
 import streamlit as st
+from snowflake.snowpark import Row
 from datetime import datetime, timedelta
 import logging
 
@@ -52,13 +54,13 @@ def execute_update(query, params=None):
         
         session = conn.session()
         if params:
-            result = session.sql(query).collect()
-        else:
-            # Use parameterized query
+            # Use parameterized query (%s placeholders)
             cursor = session.connection.cursor()
-            cursor.execute(query, params if params else ())
+            cursor.execute(query, params)
             session.connection.commit()
             cursor.close()
+        else:
+            session.sql(query).collect()
         return True
     except Exception as e:
         logger.error(f"Update execution error: {e}")
@@ -638,22 +640,27 @@ def get_activity_log(user_id: int):
 
         session = conn.session()
         query = f"""
-        SELECT action as activity, details as description, created_at
+        SELECT action as activity, details as description, created_at,
+               DATEDIFF('second', created_at, CURRENT_TIMESTAMP()) as age_seconds
         FROM activity_log
         WHERE user_id = {user_id} AND action != 'login'
         ORDER BY created_at DESC
         LIMIT 3"""
 
         result = session.sql(query).collect()
+        queried_at = time.time()
 
         if result and len(result) > 0:
             # Convert Snowflake Row objects to dictionaries
+            # (QUERIED_AT lets a cached copy add the time elapsed since AGE_SECONDS was measured)
             activities = []
             for row in result:
                 activities.append({
                     'ACTIVITY': row['ACTIVITY'],
                     'DESCRIPTION': row['DESCRIPTION'],
-                    'CREATED_AT': row['CREATED_AT']
+                    'CREATED_AT': row['CREATED_AT'],
+                    'AGE_SECONDS': row['AGE_SECONDS'],
+                    'QUERIED_AT': queried_at
                 })
             return activities
         return None
@@ -755,16 +762,27 @@ def get_qa_data(category: str, difficulty: str, target_certification: str):
         
         session = conn.session()
 
+        # Bind values instead of inlining them, so the filters can't alter the SQL
+        # (%s placeholders on the cursor, same paramstyle as execute_update)
+        query = "SELECT * FROM aws_scenarios WHERE target_certification ILIKE %s"
+        params = [f"%{target_certification}%"]
+        
         if category != "All":
-            query = f"SELECT * FROM aws_scenarios WHERE target_certification ILIKE '%{target_certification}%' AND lower(category) = lower('{category}')"
-        else:
-            query = f"SELECT * FROM aws_scenarios WHERE target_certification ILIKE '%{target_certification}%'"
+            query += " AND lower(category) = lower(%s)"
+            params.append(category)
         
         if difficulty != "All":
-            query = query + f" AND lower(difficulty) = lower('{difficulty}')"
-
-        result = session.sql(query).collect()
-        return result
+            query += " AND lower(difficulty) = lower(%s)"
+            params.append(difficulty)
+
+        cursor = session.connection.cursor()
+        try:
+            cursor.execute(query, tuple(params))
+            columns = [column[0] for column in cursor.description]
+            # Rows keep attribute access (row.CATEGORY) like session.sql(...).collect()
+            return [Row(**dict(zip(columns, values))) for values in cursor.fetchall()]
+        finally:
+            cursor.close()
     except Exception as e:
         logger.error(f"Error retrieving Q&A data: {e}")
         return None
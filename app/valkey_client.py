@@ -97,6 +97,29 @@ class ValkeyClient:
             logger.error(f"Error popping question from queue: {e}")
             return None
     
+    def blocking_pop_question(self, session_id: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
+        """
+        Pop the next question, waiting until one is pushed to the queue
+        
+        Args:
+            session_id: Exam session ID
+            timeout: Maximum seconds to wait
+        Returns:
+            dict: Question object or None on timeout
+        """
+        if not self.is_connected():
+            return None
+        
+        try:
+            queue_key = f"exam_queue:{session_id}"
+            item = self.client.blpop([queue_key], timeout=timeout)
+            if item:
+                return json.loads(item[1])
+            return None
+        except Exception as e:
+            logger.error(f"Error waiting for question from queue: {e}")
+            return None
+    
     def get_queue_length(self, session_id: str) -> int:
         """Get current queue length"""
         if not self.is_connected():
@@ -159,10 +182,15 @@ class ValkeyClient:
             return False
         
         try:
-            session = self.get_session(session_id)
-            if session:
+            # Talk to the client directly: going through get_session/save_session
+            # would add a ping round-trip before each of the two commands
+            key = f"session:{session_id}"
+            data = self.client.get(key)
+            if data:
+                session = json.loads(data)
                 session.update(updates)
-                return self.save_session(session_id, session)
+                self.client.setex(key, 7200, json.dumps(session))
+                return True
             return False
         except Exception as e:
             logger.error(f"Error updating session: {e}")
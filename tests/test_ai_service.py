@@ -0,0 +1,165 @@
+"""
+Tests for the n8n webhook client in app/ai_service.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+import ai_service
+from ai_service import AIService
+
+
+@pytest.fixture
+def webhook():
+    """
+    Start local webhooks; yields start(respond) -> (url, list of received JSON bodies)
+
+    respond(body) returns (status, response, delay in seconds) for each POST; the
+    response is a dict sent as JSON, or raw bytes sent as-is.
+    """
+    servers = []
+
+    def start(respond):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                received.append(body)
+                status, payload, delay = respond(body)
+                time.sleep(delay)
+                try:
+                    self.send_response(status)
+                    self.end_headers()
+                    self.wfile.write(payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+                except OSError:
+                    pass  # Client already gave up
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/webhook", received
+
+    AIService._circuits.clear()
+    try:
+        yield start
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        AIService._circuits.clear()
+
+
+def test_read_timeout_sends_one_post(webhook):
+    url, received = webhook(lambda body: (200, {}, 2))
+    service = AIService()
+
+    started = time.monotonic()
+    result = service._call_n8n_webhook(url, {"question": "What is S3?"}, read_timeout=0.5)
+    elapsed = time.monotonic() - started
+
+    assert result == {"error": "Request timed out", "retryable": False}
+    assert len(received) == 1
+    assert elapsed < 2
+
+
+def test_client_error_is_not_retried_and_logged(webhook, caplog):
+    url, received = webhook(lambda body: (404, {"message": "webhook not registered"}, 0))
+    service = AIService()
+
+    with caplog.at_level("WARNING", logger="ai_service"):
+        result = service._call_n8n_webhook(url, {"question": "What is S3?"})
+
+    assert result == {"error": "HTTP 404"}
+    assert len(received) == 1
+    assert "HTTP 404" in caplog.text
+
+
+def test_chat_cache_is_per_user(webhook):
+    url, received = webhook(lambda body: (200, {"output": f"answer for user {body['user_id']}"}, 0))
+    service = AIService()
+    service._endpoints["chat"] = url
+    ai_service._cached_webhook_call.clear()
+
+    assert service.answer_question(1, "What is S3?") == "answer for user 1"
+    assert service.answer_question(2, "What is S3?") == "answer for user 2"
+    assert service.answer_question(1, "What is S3?") == "answer for user 1"
+    assert [body["user_id"] for body in received] == [1, 2]
+
+
+def test_fallback_prefers_knowledge_base_order():
+    # EC2 comes before Lambda in FALLBACK_KNOWLEDGE_BASE, whatever order the question uses
+    answer = AIService._get_fallback_response("Should I use Lambda or EC2?")
+    assert answer == ai_service.FALLBACK_RESPONSES["ec2"]
+    assert AIService._get_fallback_response("Any lambdas here?") == ai_service.FALLBACK_RESPONSES["lambda"]
+
+
+def test_circuit_opens_after_repeated_failures_and_probes_after_reset(webhook, monkeypatch):
+    healthy = threading.Event()
+    url, received = webhook(lambda body: (200, {"ok": True}, 0 if healthy.is_set() else 1))
+    service = AIService()
+    monkeypatch.setattr(ai_service, "CIRCUIT_RESET_SECONDS", 0.5)
+
+    # Each read timeout counts as one failure
+    for _ in range(ai_service.CIRCUIT_FAIL_MAX):
+        assert service._call_n8n_webhook(url, {"n": len(received)}, read_timeout=0.2)["error"] == "Request timed out"
+    assert len(received) == ai_service.CIRCUIT_FAIL_MAX
+
+    # Open: calls are skipped without reaching n8n
+    assert service._call_n8n_webhook(url, {"n": "skipped"}) == {"error": "n8n unavailable", "retryable": False}
+    assert len(received) == ai_service.CIRCUIT_FAIL_MAX
+
+    # After the reset window one probe goes through, and its success closes the circuit
+    healthy.set()
+    time.sleep(0.6)
+    assert service._call_n8n_webhook(url, {"n": "probe"}) == {"ok": True}
+    assert len(received) == ai_service.CIRCUIT_FAIL_MAX + 1
+    assert url not in AIService._circuits
+
+
+def _call_together(service, url, data, callers=4):
+    """Make identical overlapping webhook calls; returns one Future per caller"""
+    barrier = threading.Barrier(callers)
+
+    def call():
+        barrier.wait()
+        return service._call_n8n_webhook(url, data)
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return [pool.submit(call) for _ in range(callers)]
+
+
+def test_overlapping_identical_calls_share_one_post(webhook):
+    url, received = webhook(lambda body: (200, {"output": "S3 is object storage"}, 0.5))
+    service = AIService()
+
+    futures = _call_together(service, url, {"question": "What is S3?"})
+
+    assert [future.result() for future in futures] == [{"output": "S3 is object storage"}] * 4
+    assert len(received) == 1
+    assert not AIService._inflight
+
+
+def test_overlapping_calls_all_see_the_leaders_exception(webhook):
+    url, received = webhook(lambda body: (200, b"not json", 0.5))
+    service = AIService()
+
+    futures = _call_together(service, url, {"question": "What is S3?"})
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+    assert len(received) == 1
+    assert not AIService._inflight